@@ -6,11 +6,16 @@ Integrated with Django Orders App
 
 import streamlit as st
 import requests
-import pandas as pd
-import json
-from datetime import datetime
+import io
 import time
-from config import API_BASE_URL, API_ENDPOINTS, APP_NAME, APP_ICON, PAGE_ICON, LAYOUT
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (
+    API_BASE_URL, API_ENDPOINTS, APP_NAME, APP_ICON, PAGE_ICON, LAYOUT, STATUS_CELL_STYLES, DEFAULT_PAGE_SIZE,
+    SEND_JOB_STALL_TIMEOUT
+)
 
 # Page configuration
 st.set_page_config(
@@ -20,62 +25,89 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Custom CSS for better UI
+CUSTOM_CSS = """
+<style>
+.stMetric > div > div > div > div {
+    font-size: 1.1rem;
+}
+.uploadedFile {
+    border: 2px dashed #1f77b4;
+    border-radius: 10px;
+    padding: 10px;
+}
+.stProgress .progress-text {
+    font-size: 1rem;
+    font-weight: bold;
+}
+</style>
+"""
+
 # Session Management Functions
 def get_stored_token():
     """Get token from URL params using newer Streamlit API"""
     try:
         query_params = st.query_params
         return query_params.get("token", None)
-    except:
+    except AttributeError:
         try:
             query_params = st.experimental_get_query_params()
             return query_params.get("token", [None])[0]
-        except:
+        except AttributeError:
             return None
 
 def store_token_in_url(token: str):
     """Store token in URL parameters for persistence"""
+    # Skip the write (and the browser round trip it causes) when the URL already has it
     try:
-        st.query_params["token"] = token
-    except:
+        if st.query_params.get("token") != token:
+            st.query_params["token"] = token
+    except AttributeError:
         try:
-            st.experimental_set_query_params(token=token)
-        except:
+            if st.experimental_get_query_params().get("token", [None])[0] != token:
+                st.experimental_set_query_params(token=token)
+        except AttributeError:
             pass
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_token_user(token: str):
+    """Fetch user info for a token; raises on failure so rejected tokens are never cached"""
+    return _get_json(token, API_ENDPOINTS['auth']['verify_token'], timeout=5)
+
 def validate_token(token: str):
     """Validate token with Django backend and return user info"""
     if not token:
         return None
 
     try:
-        response = requests.get(
-            f"{API_BASE_URL}{API_ENDPOINTS['auth']['verify_token']}",
-            headers={"Authorization": f"Token {token}"},  # Django Token auth
-            timeout=5
-        )
-
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
+        return _fetch_token_user(token)
     except Exception as e:
         print(f"Token validation error: {e}")
         return None
 
 def clear_session():
     """Clear session state and URL parameters"""
-    keys_to_clear = ["access_token", "user_name", "is_authenticated", "session_checked"]
+    token = st.session_state.get("access_token")
+    keys_to_clear = [
+        "access_token", "auth_headers", "user_name", "is_authenticated", "session_checked",
+        # Per-user working state, so the next login in this tab starts clean
+        "_upload_bytes", "send_job", "selected_file_id", "payment_file_filter", "payment_auto_refresh",
+        "activity_page", "activity_pages_seen"
+    ]
     for key in keys_to_clear:
         if key in st.session_state:
             del st.session_state[key]
 
+    # Drop this token's cached validation so it is re-checked; other users' entries stay
+    if token:
+        _fetch_token_user.clear(token)
+
     try:
         st.query_params.clear()
-    except:
+    except AttributeError:
         try:
             st.experimental_set_query_params()
-        except:
+        except AttributeError:
             pass
 
 def init_session_state():
@@ -91,6 +123,7 @@ def init_session_state():
 
                 if user_info:
                     st.session_state.access_token = stored_token
+                    set_auth_headers(stored_token)
                     st.session_state.user_name = user_info.get("user", {}).get("username", "User")
                     st.session_state.is_authenticated = True
                     st.success(f"Welcome back, {st.session_state.user_name}!")
@@ -102,23 +135,58 @@ def init_session_state():
         st.session_state.is_authenticated = False
 
 # API Request Functions
-def make_api_request(endpoint: str, method: str = "GET", data: dict = None, files: dict = None):
-    """Make API request with Django Token authentication"""
+@st.cache_resource
+def http_session():
+    """Process-wide pooled HTTP session shared by every browser session (auth is passed per call)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=50,
+        max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def background_executor():
+    """Process-wide thread pool for firing independent API reads in parallel"""
+    return ThreadPoolExecutor(max_workers=8)
+
+def set_auth_headers(token: str):
+    """Build the logged-in user's Authorization header once, for reuse on every request"""
+    st.session_state.auth_headers = {"Authorization": f"Token {token}"}
+
+def auth_headers():
+    """Authorization header for the logged-in user (empty when logged out)"""
+    return st.session_state.get("auth_headers", {})
+
+def _get_json(token: str, endpoint: str, params: dict = None, timeout: int = 10):
+    """GET an endpoint as the given user and return its JSON; raises on HTTP errors so cached
+    loaders never store a failed response"""
+    response = http_session().get(
+        f"{API_BASE_URL}{endpoint}",
+        headers={"Authorization": f"Token {token}"},  # Django Token auth
+        params=params,
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json()
+
+def make_api_request(endpoint: str, method: str = "GET", data: dict = None, files: dict = None, params: dict = None):
+    """Make API request with Django Token authentication; params are URL-encoded into the query string"""
     url = f"{API_BASE_URL}{endpoint}"
-    headers = {}
 
-    if "access_token" in st.session_state:
-        headers["Authorization"] = f"Token {st.session_state.access_token}"
+    if method == "GET":
+        options = {"timeout": 10}
+    elif files:
+        options = {"data": data, "files": files, "timeout": 60}
+    else:
+        # json= sets the Content-Type header itself
+        options = {"json": data, "timeout": 30}
 
     try:
-        if method == "GET":
-            return requests.get(url, headers=headers, timeout=10)
-        elif method == "POST":
-            if files:
-                return requests.post(url, headers=headers, data=data, files=files, timeout=60)
-            else:
-                headers["Content-Type"] = "application/json"
-                return requests.post(url, headers=headers, json=data, timeout=30)
+        return http_session().request(method, url, headers=auth_headers(), params=params, **options)
     except requests.exceptions.ConnectionError:
         st.error("Cannot connect to the backend API. Please ensure the Django server is running on port 8000.")
         return None
@@ -129,24 +197,121 @@ def make_api_request(endpoint: str, method: str = "GET", data: dict = None, file
         st.error(f"API request failed: {str(e)}")
         return None
 
-def make_streaming_request(endpoint: str, files: dict):
-    """Make streaming API request for progress updates"""
-    url = f"{API_BASE_URL}{endpoint}"
-    headers = {}
+# Token-keyed loaders: cached for a short TTL so widget reruns don't refetch the same data
+@st.cache_data(ttl=30, show_spinner=False)
+def _list_processed_files(token: str):
+    """A user's processed chat files"""
+    return _get_json(token, API_ENDPOINTS['orders']['processed_files']).get('results', [])
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _list_validated_files(token: str):
+    """A user's validated order files"""
+    return _get_json(token, API_ENDPOINTS['orders']['validated_files']).get('results', [])
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _list_orders(token: str, validated_file: int = None):
+    """A user's orders, plus file_stats when filtered by file"""
+    return _get_json(
+        token,
+        API_ENDPOINTS['orders']['orders'],
+        params={'validated_file': validated_file} if validated_file else None
+    )
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _fetch_stats(token: str):
+    """Dashboard stats for a user"""
+    return _get_json(token, API_ENDPOINTS['orders']['stats'])
 
-    if "access_token" in st.session_state:
-        headers["Authorization"] = f"Token {st.session_state.access_token}"
+def _analytics_page_params(activity_page: int):
+    """limit/offset query params for one page of recent activity"""
+    return {'limit': DEFAULT_PAGE_SIZE, 'offset': (activity_page - 1) * DEFAULT_PAGE_SIZE}
 
+@st.cache_data(ttl=60, show_spinner="Loading analytics...")
+def _get_analytics(token: str):
+    """Read-only analytics aggregates for a user, with the first page of recent activity"""
+    return _get_json(token, API_ENDPOINTS['orders']['analytics'], params=_analytics_page_params(1))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _get_recent_activity(token: str, activity_page: int):
+    """A later page of a user's recent activity; the aggregates are cached once by _get_analytics"""
+    response = _get_json(token, API_ENDPOINTS['orders']['analytics'], params=_analytics_page_params(activity_page))
+    return response.get('recent_activity', [])
+
+def load_cached(loader, *args):
+    """Call a token-keyed cached loader for the logged-in user; None if the request failed"""
     try:
-        response = requests.post(
-            url,
-            headers=headers,
-            files=files,
-            stream=True,
-            timeout=600  # 10 minute timeout for large files
-        )
+        return loader(st.session_state.access_token, *args)
+    except requests.exceptions.RequestException as e:
+        print(f"API request failed: {e}")
+        return None
+
+def _fill_cache(loader, token: str, *args):
+    """Run a token-keyed cached loader off the script thread, logging instead of raising failures"""
+    try:
+        loader(token, *args)
+    except requests.exceptions.RequestException as e:
+        print(f"Cache prefetch failed: {e}")
+
+def prefetch(loader, *args):
+    """Start a cached loader for the logged-in user in the background; a later load_cached call
+    with the same args then hits the warm cache (or waits on the in-flight request)"""
+    background_executor().submit(_fill_cache, loader, st.session_state.access_token, *args)
+
+def prewarm_caches():
+    """Start filling the per-user caches in the background so the first pages load instantly"""
+    for loader in (_fetch_stats, _list_processed_files, _list_validated_files):
+        prefetch(loader)
+
+def _extract_error(response, default: str) -> str:
+    """Pull a readable error message out of a failed API response, falling back to default"""
+    if response is None:
+        return default
+    try:
+        body = response.json()
+    except ValueError:
+        return default
+    if not isinstance(body, dict):
+        return default
+
+    errors = body.get("errors")
+    if isinstance(errors, dict) and errors.get("non_field_errors"):
+        return errors["non_field_errors"][0]
+    if errors:
+        return str(errors)
+    return body.get("error") or body.get("detail") or default
+
+def _ok_or_close(response):
+    """Return a streamed response if it is a 200; otherwise close it so its pooled connection is
+    released now instead of at garbage collection"""
+    if response.status_code != 200:
+        response.close()
+        return None
+    return response
+
+def make_streaming_request(endpoint: str, files: dict = None):
+    """Make streaming API request for progress updates (POST with files, otherwise GET an SSE stream)"""
+    url = f"{API_BASE_URL}{endpoint}"
+    session = http_session()
+    headers = auth_headers()
+
+    try:
+        if files:
+            response = session.post(
+                url,
+                headers=headers,
+                files=files,
+                stream=True,
+                timeout=600  # 10 minute timeout for large files
+            )
+        else:
+            response = session.get(
+                url,
+                headers={**headers, "Accept": "text/event-stream", "Cache-Control": "no-cache"},
+                stream=True,
+                timeout=600
+            )
 
-        return response if response.status_code == 200 else None
+        return _ok_or_close(response)
 
     except requests.exceptions.ConnectionError:
         st.error("Cannot connect to the backend API. Please ensure the Django server is running.")
@@ -155,6 +320,58 @@ def make_streaming_request(endpoint: str, files: dict):
         st.error(f"Streaming request failed: {str(e)}")
         return None
 
+def make_api_request_streamed(endpoint: str, params: dict = None):
+    """Make streamed GET request so large downloads are read in chunks"""
+    url = f"{API_BASE_URL}{endpoint}"
+
+    try:
+        response = http_session().get(url, headers=auth_headers(), params=params, stream=True, timeout=600)
+        return _ok_or_close(response)
+    except requests.exceptions.ConnectionError:
+        st.error("Cannot connect to the backend API. Please ensure the Django server is running.")
+        return None
+    except Exception as e:
+        st.error(f"Download failed: {str(e)}")
+        return None
+
+def download_file(endpoint: str, params: dict = None):
+    """Fetch a file download and return its bytes (st.download_button needs the whole body anyway)"""
+    response = make_api_request_streamed(endpoint, params=params)
+    if response is None:
+        return None
+
+    with response:
+        return response.content
+
+def show_save_button(processed_file: dict, key: str = None):
+    """Render a save control for a processed file, preferring a signed link so the bytes bypass Streamlit"""
+    file_endpoint = f"{API_ENDPOINTS['orders']['processed_files']}{processed_file['id']}"
+
+    link_response = make_api_request(f"{file_endpoint}/download_link/")
+    if link_response and link_response.status_code == 200:
+        st.link_button("💾 Save File", link_response.json()['url'])
+        return
+
+    # Backend without signed links: stream the file through the app instead
+    downloaded = download_file(f"{file_endpoint}/download/")
+    if downloaded:
+        st.download_button(
+            label="💾 Save File",
+            data=downloaded,
+            file_name=processed_file['file_name'],
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key=key,
+            on_click="ignore"
+        )
+
+def get_upload_bytes(uploaded_file):
+    """Read an uploaded file's bytes once per upload and reuse them across reruns"""
+    cached = st.session_state.get("_upload_bytes")
+    if cached is None or cached[0] != uploaded_file.file_id:
+        cached = (uploaded_file.file_id, uploaded_file.getvalue())
+        st.session_state["_upload_bytes"] = cached
+    return cached[1]
+
 # Authentication Pages
 def show_login_register_page():
     """Display login and registration forms"""
@@ -182,6 +399,8 @@ def show_login_register_page():
                     if response and response.status_code == 200:
                         data = response.json()
                         st.session_state.access_token = data["token"]
+                        set_auth_headers(data["token"])
+                        prewarm_caches()
                         st.session_state.user_name = data["user"]["username"]
                         st.session_state.is_authenticated = True
 
@@ -190,13 +409,8 @@ def show_login_register_page():
                         st.success(f"Welcome back, {data['user']['username']}!")
                         st.rerun()
                     else:
-                        if response:
-                            try:
-                                error_data = response.json()
-                                error_msg = error_data.get("errors", {}).get("non_field_errors", ["Login failed"])[0]
-                            except:
-                                error_msg = "Login failed"
-                            st.error(f"Authentication failed: {error_msg}")
+                        if response is not None:
+                            st.error(f"Authentication failed: {_extract_error(response, 'Login failed')}")
                         else:
                             st.error("Unable to connect to server")
                 else:
@@ -239,13 +453,8 @@ def show_login_register_page():
                         st.success("Registration successful! Please login with your credentials.")
                         st.info("Switch to the Login tab to sign in.")
                     else:
-                        if response:
-                            try:
-                                error_data = response.json()
-                                error_msg = str(error_data.get("errors", "Registration failed"))
-                            except:
-                                error_msg = "Registration failed"
-                            st.error(f"Registration failed: {error_msg}")
+                        if response is not None:
+                            st.error(f"Registration failed: {_extract_error(response, 'Registration failed')}")
                         else:
                             st.error("Unable to connect to server")
 
@@ -272,6 +481,10 @@ def show_dashboard_page():
         clear_session()
         st.rerun()
 
+    # The cached upload only serves the Extract page; release it once the user moves on
+    if selected_page != "📄 Extract Orders":
+        st.session_state.pop("_upload_bytes", None)
+
     # Display selected page content
     if selected_page == "📊 Dashboard":
         show_dashboard_content()
@@ -292,11 +505,9 @@ def show_dashboard_content():
     st.markdown("Welcome to your WhatsApp Order Processing dashboard!")
 
     # Get dashboard stats from Django API
-    response = make_api_request(API_ENDPOINTS['orders']['stats'])
-
-    if response and response.status_code == 200:
-        stats = response.json()
+    stats = load_cached(_fetch_stats)
 
+    if stats is not None:
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
@@ -354,6 +565,8 @@ def show_dashboard_content():
 
 def show_extract_orders_page():
     """Enhanced Extract Orders page - Using File 1's superior streaming UI"""
+    import json
+
     st.title("📄 Extract Orders from WhatsApp Chat")
     st.markdown("Upload a WhatsApp chat export file (.txt) to extract order information using AI.")
 
@@ -370,12 +583,13 @@ def show_extract_orders_page():
 
         if uploaded_file is not None:
             st.success(f"✅ File uploaded: {uploaded_file.name}")
-            file_size = len(uploaded_file.getvalue())
+            raw = get_upload_bytes(uploaded_file)
+            file_size = len(raw)
             st.info(f"📊 File size: {file_size:,} bytes ({file_size / 1024:.1f} KB)")
 
             # Show file preview
             if st.checkbox("👀 Preview file content"):
-                content_preview = uploaded_file.getvalue().decode('utf-8')[:1000]
+                content_preview = raw[:1000].decode('utf-8', errors='replace')
                 st.text_area("File Preview (first 1000 characters):", content_preview, height=150)
 
             if st.button("🚀 Process & Extract Orders", type="primary", use_container_width=True):
@@ -391,12 +605,13 @@ def show_extract_orders_page():
                 with metrics_col3:
                     progress_metric = st.empty()
 
-                # Upload file first
-                files = {"filepath": (uploaded_file.name, uploaded_file, "text/plain")}
+                # Upload the file and start processing in a single call
+                files = {"filepath": (uploaded_file.name, io.BytesIO(raw), "text/plain")}
                 upload_response = make_api_request(
                     API_ENDPOINTS['orders']['chatfiles'],
                     method="POST",
-                    files=files
+                    files=files,
+                    params={'auto_process': 1}
                 )
 
                 if upload_response and upload_response.status_code == 201:
@@ -405,101 +620,111 @@ def show_extract_orders_page():
 
                     st.success(f"✅ File uploaded successfully! Processing ID: {chat_file_id}")
 
-                    # Trigger processing
-                    process_response = make_api_request(
-                        f"{API_ENDPOINTS['orders']['chatfiles']}{chat_file_id}/process/",
-                        method="POST"
-                    )
+                    status_text.info("🔄 Processing started... This may take several minutes due to AI rate limits.")
 
-                    if process_response and process_response.status_code == 200:
-                        process_data = process_response.json()
-
-                        # Simulate processing progress (since we don't have streaming yet)
-                        status_text.info("🔄 Processing started... This may take several minutes due to AI rate limits.")
-
-                        # Poll for completion with longer intervals due to AI rate limits
-                        max_polls = 60  # 15 minutes max (60 * 15 seconds)
-                        poll_count = 0
-
-                        while poll_count < max_polls:
-                            time.sleep(15)  # Poll every 15 seconds (reduced API load)
-                            poll_count += 1
-
-                            # Check if processing is complete
-                            status_response = make_api_request(f"{API_ENDPOINTS['orders']['chatfiles']}{chat_file_id}/")
-
-                            if status_response and status_response.status_code == 200:
-                                status_data = status_response.json()
-
-                                # Update progress more conservatively
-                                # progress = min(poll_count / max_polls, 0.90)
-                                # progress_bar.progress(progress)
-                                # progress_metric.metric("Progress", f"{int(progress * 100)}%")
-
-                                if status_data.get('is_processed'):
-                                    # Processing complete!
-                                    # progress_bar.progress(100.0)
-                                    status_text.success("✅ Processing complete!")
-
-                                    # Get processed file info
-                                    processed_response = make_api_request(f"{API_ENDPOINTS['orders']['processed_files']}")
-                                    if processed_response and processed_response.status_code == 200:
-                                        processed_files = processed_response.json().get('results', [])
-                                        latest_file = None
-
-                                        # Safely search for matching processed file
-                                        if processed_files:
-                                            try:
-                                                latest_file = next((f for f in processed_files if f.get('chatfile') == chat_file_id), None)
-                                            except (KeyError, TypeError) as e:
-                                                st.error(f"Error finding processed file: {e}")
-                                                latest_file = None
-
-                                        if latest_file:
-                                            st.markdown("---")
-                                            st.subheader("📋 Processing Results")
-
-                                            # Display results
-                                            col1, col2, col3 = st.columns(3)
-                                            with col1:
-                                                messages_metric.metric("Total Messages", latest_file['total_messages'])
-                                            with col2:
-                                                orders_metric.metric("Orders Found", latest_file['total_orders'])
-                                            with col3:
-                                                st.metric("Processing Time", "Complete")
-
-                                            # Download button
-                                            if st.button("📥 Download Processed File", use_container_width=True):
-                                                download_response = make_api_request(
-                                                    f"{API_ENDPOINTS['orders']['processed_files']}{latest_file['id']}/download/"
-                                                )
-                                                if download_response and download_response.status_code == 200:
-                                                    st.download_button(
-                                                        label="💾 Save File",
-                                                        data=download_response.content,
-                                                        file_name=latest_file['file_name'],
-                                                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                                                    )
-                                    break
-                                elif status_data.get('processing_error'):
-                                    status_text.error(f"❌ Processing failed: {status_data['processing_error']}")
-                                    break
+                    # Follow server-sent progress events instead of polling the chat file
+                    progress_response = make_streaming_request(
+                        f"{API_ENDPOINTS['orders']['chatfiles']}{chat_file_id}/progress/"
+                    )
+                    status_data = {}
+
+                    if progress_response is not None:
+                        # Closing on exit also frees the connection when a widget interaction
+                        # interrupts the script mid-stream
+                        with progress_response:
+                            # SSE is always UTF-8; requests would guess ISO-8859-1 for a charset-less text/*
+                            progress_response.encoding = "utf-8"
+                            last_progress = 0.0
+                            last_message = None
+
+                            with st.status("🔄 Processing chat file", expanded=True) as status:
+                                try:
+                                    for line in progress_response.iter_lines(decode_unicode=True):
+                                        # Each SSE frame carries one JSON payload on a "data:" line
+                                        if not line or not line.startswith("data:"):
+                                            continue
+                                        try:
+                                            payload = json.loads(line[len("data:"):].strip())
+                                        except json.JSONDecodeError:
+                                            continue
+                                        if not isinstance(payload, dict):
+                                            continue
+
+                                        # Only send UI updates when something visibly changed
+                                        try:
+                                            progress = min(float(payload.get('progress') or 0), 1.0)
+                                        except (TypeError, ValueError):
+                                            progress = last_progress
+                                        if progress - last_progress > 0.02:
+                                            last_progress = progress
+                                            progress_bar.progress(last_progress)
+                                            progress_metric.metric("Progress", f"{int(last_progress * 100)}%")
+
+                                        message = payload.get('message')
+                                        if message and message != last_message:
+                                            last_message = message
+                                            status.update(label=f"🔄 {message}")
+
+                                        if payload.get('done') or payload.get('error'):
+                                            status_data = payload
+                                            break
+                                except requests.exceptions.RequestException as e:
+                                    # Dropped or stalled stream: fall through to the "taking longer" notice
+                                    print(f"Progress stream interrupted: {e}")
+
+                                if status_data.get('done'):
+                                    status.update(label="✅ Processing complete", state="complete", expanded=False)
                                 else:
-                                    status_text.info(f"🔄 Processing... (Step {poll_count}/{max_polls})")
-
-                            # Update UI during processing
-                            if poll_count % 4 == 0:  # Every 20 seconds
-                                status_text.info("🤖 AI is classifying messages... This takes time due to rate limits.")
-
-                        if poll_count >= max_polls:
-                            status_text.warning("⏰ Processing is taking longer than expected. Please check back later.")
+                                    status.update(label="❌ Processing did not finish", state="error")
+
+                    if progress_response is None:
+                        status_text.error(
+                            "❌ Could not open the processing progress stream. "
+                            "The file was uploaded; check Manage Files for the results later."
+                        )
+                    elif status_data.get('done'):
+                        # Processing complete!
+                        progress_bar.progress(1.0)
+                        status_text.success("✅ Processing complete!")
+
+                        # The new file should show up on Manage Files and the Dashboard right away
+                        _list_processed_files.clear(st.session_state.access_token)
+                        _fetch_stats.clear(st.session_state.access_token)
+
+                        # Get processed file info
+                        processed_response = make_api_request(
+                            API_ENDPOINTS['orders']['processed_files'], params={'chatfile': chat_file_id}
+                        )
+                        if processed_response and processed_response.status_code == 200:
+                            # Server filters by chat file, so the first row is the match
+                            processed_files = processed_response.json().get('results', [])
+                            latest_file = processed_files[0] if processed_files else None
+
+                            if latest_file:
+                                st.markdown("---")
+                                st.subheader("📋 Processing Results")
+
+                                # Display results
+                                col1, col2, col3 = st.columns(3)
+                                with col1:
+                                    messages_metric.metric("Total Messages", latest_file['total_messages'])
+                                with col2:
+                                    orders_metric.metric("Orders Found", latest_file['total_orders'])
+                                with col3:
+                                    st.metric("Processing Time", "Complete")
 
+                                # Download button
+                                show_save_button(latest_file)
+                    elif status_data.get('error'):
+                        status_text.error(f"❌ Processing failed: {status_data['error']}")
                     else:
-                        st.error("❌ Failed to start processing")
+                        status_text.warning("⏰ Processing is taking longer than expected. Please check back later.")
                 else:
                     st.error("❌ Failed to upload file")
 
         else:
+            # Uploader cleared: don't keep the previous file's bytes for the rest of the session
+            st.session_state.pop("_upload_bytes", None)
             st.info("👆 Please upload a WhatsApp chat file to get started.")
 
             # Show example format
@@ -512,48 +737,43 @@ def show_extract_orders_page():
                 """, language="text")
                 st.caption("Make sure your WhatsApp export follows this format: DD/MM/YYYY, HH:MM - Sender: Message")
 
+@st.fragment
+def show_processed_files(files: list):
+    """Processed file expanders; interactions here rerun only this fragment, not the page fetch"""
+    for file_info in files:
+        with st.expander(f"📄 {file_info['file_name']} - {file_info.get('total_messages', 0)} messages"):
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.write(f"**Processed:** {file_info.get('processed_at', 'N/A')[:16]}")
+                st.write(f"**Messages:** {file_info.get('total_messages', 0)}")
+                st.write(f"**Orders Found:** {file_info.get('total_orders', 0)}")
+                st.write(f"**Queries:** {file_info.get('total_queries', 0)}")
+
+            with col2:
+                if st.button(f"📥 Download", key=f"download_{file_info['id']}"):
+                    show_save_button(file_info, key=f"save_{file_info['id']}")
+
+                if file_info.get('total_orders', 0) > 0:
+                    if st.button(f"✏️ Validate Orders", key=f"validate_{file_info['id']}"):
+                        st.session_state.selected_file_for_validation = file_info['id']
+                        st.info("👆 Download the file above, validate the orders, then upload the corrected version below.")
+
 def show_manage_files_page():
     """Manage processed files and validation"""
+    from datetime import datetime
+
     st.title("📂 Manage Files")
     st.markdown("View and manage your processed chat files.")
 
     # Get processed files from API
-    response = make_api_request(API_ENDPOINTS['orders']['processed_files'])
-
-    if response and response.status_code == 200:
-        files = response.json().get('results', [])
+    files = load_cached(_list_processed_files)
 
+    if files is not None:
         if files:
             st.subheader("📋 Processed Files")
 
-            for file_info in files:
-                with st.expander(f"📄 {file_info['file_name']} - {file_info.get('total_messages', 0)} messages"):
-                    col1, col2 = st.columns(2)
-
-                    with col1:
-                        st.write(f"**Processed:** {file_info.get('processed_at', 'N/A')[:16]}")
-                        st.write(f"**Messages:** {file_info.get('total_messages', 0)}")
-                        st.write(f"**Orders Found:** {file_info.get('total_orders', 0)}")
-                        st.write(f"**Queries:** {file_info.get('total_queries', 0)}")
-
-                    with col2:
-                        if st.button(f"📥 Download", key=f"download_{file_info['id']}"):
-                            download_response = make_api_request(
-                                f"{API_ENDPOINTS['orders']['processed_files']}{file_info['id']}/download/"
-                            )
-                            if download_response and download_response.status_code == 200:
-                                st.download_button(
-                                    label="💾 Save File",
-                                    data=download_response.content,
-                                    file_name=file_info['file_name'],
-                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                    key=f"save_{file_info['id']}"
-                                )
-
-                        if file_info.get('total_orders', 0) > 0:
-                            if st.button(f"✏️ Validate Orders", key=f"validate_{file_info['id']}"):
-                                st.session_state.selected_file_for_validation = file_info['id']
-                                st.info("👆 Download the file above, validate the orders, then upload the corrected version below.")
+            show_processed_files(files)
         else:
             st.info("No processed files found. Upload and process a chat file first.")
     else:
@@ -575,9 +795,12 @@ def show_manage_files_page():
         col1, col2 = st.columns(2)
 
         with col1:
+            # Select by id so files sharing a name stay distinct
+            file_names = {f['id']: f['file_name'] for f in files or []}
             original_parsed_file = st.selectbox(
                 "Link to original processed file (optional):",
-                options=["None"] + [f['file_name'] for f in files] if files else ["None"]
+                options=[None] + list(file_names),
+                format_func=lambda file_id: "None" if file_id is None else file_names[file_id]
             )
 
         with col2:
@@ -585,11 +808,8 @@ def show_manage_files_page():
                 files_upload = {"filepath": (validated_file.name, validated_file)}
                 data = {}
 
-                if original_parsed_file != "None":
-                    # Find the original file ID
-                    original_file = next((f for f in files if f['file_name'] == original_parsed_file), None)
-                    if original_file:
-                        data['original_parsed_file'] = original_file['id']
+                if original_parsed_file is not None:
+                    data['original_parsed_file'] = original_parsed_file
 
                 response = make_api_request(
                     API_ENDPOINTS['orders']['validated_files'],
@@ -601,6 +821,7 @@ def show_manage_files_page():
                 if response and response.status_code == 201:
                     upload_data = response.json()
                     st.success("✅ Validated file uploaded successfully!")
+                    _list_validated_files.clear(st.session_state.access_token)
 
                     # Show next steps
                     st.info("🎯 **Next Steps:**")
@@ -617,46 +838,145 @@ def show_manage_files_page():
                     time.sleep(2)  # Brief pause to read
                     st.rerun()
                 else:
-                    error_msg = "Failed to upload validated file"
-                    if response:
-                        try:
-                            error_data = response.json()
-                            error_msg = error_data.get('error', error_msg)
-                        except:
-                            pass
-                    st.error(f"❌ {error_msg}")
+                    st.error(f"❌ {_extract_error(response, 'Failed to upload validated file')}")
+
+def show_send_results(send_data: dict):
+    """Summary metrics and per-order results of a finished message send"""
+    import pandas as pd
+
+    orders_extracted = send_data.get('orders_extracted', 0)
+    st.success(f"✅ Extracted {orders_extracted} orders successfully!")
+
+    if orders_extracted > 0:
+        st.success("✅ Messages sent successfully!")
+
+        # Show summary
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📤 Total Orders", send_data.get('total_orders', 0))
+        with col2:
+            st.metric("✅ Sent", send_data.get('sent_count', 0))
+        with col3:
+            st.metric("❌ Failed", send_data.get('failed_count', 0))
+
+        st.info(f"⏱️ Total time: {send_data.get('total_time_seconds', 0)} seconds")
+
+        # Show detailed results
+        if send_data.get('results'):
+            st.subheader("📋 Detailed Results")
+
+            # Only the displayed columns, with declared dtypes instead of inference
+            results_df = pd.DataFrame.from_records(
+                send_data['results'], columns=['order_id', 'number', 'status']
+            ).astype({'order_id': 'Int64', 'number': 'string', 'status': 'category'})
+
+            # Add status icons once per distinct status, not once per row
+            results_df['status'] = results_df['status'].cat.rename_categories(
+                lambda x: f"✅ {x}" if x == 'sent' else f"❌ {x}"
+            )
+
+            # Headers are set at render time, so no renamed copy of the frame is needed
+            st.dataframe(
+                results_df,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'order_id': st.column_config.NumberColumn("Order ID"),
+                    'number': st.column_config.TextColumn("Phone Number"),
+                    'status': st.column_config.TextColumn("Status", help="WhatsApp delivery result for the order")
+                }
+            )
+    else:
+        st.warning("⚠️ No orders found to send messages for")
+
+def finish_send_job(send_job: dict, result: dict):
+    """Record a send's final result and drop the order caches it made stale"""
+    send_job['result'] = result
+    token = st.session_state.access_token
+    _list_orders.clear(token, None)
+    _list_orders.clear(token, send_job['file_id'])
+    _list_validated_files.clear(token)
+
+def resume_send_job_polling():
+    """Button callback: poll a send job again after its status went unknown"""
+    send_job = st.session_state.send_job
+    send_job['stalled'] = False
+    send_job['last_progress_at'] = time.time()
+
+def stop_tracking_send_job():
+    """Button callback: forget a send job whose status is unknown, without marking it failed"""
+    st.session_state.pop("send_job", None)
+
+@st.fragment(run_every=2)
+def show_send_job_progress():
+    """Poll the background send job and show real per-message progress until it finishes"""
+    send_job = st.session_state.send_job
+    response = make_api_request(f"{API_ENDPOINTS['orders']['send_jobs']}{send_job['id']}/")
+
+    if response is not None and response.status_code == 404:
+        # The job no longer exists; polling again won't change that
+        finish_send_job(send_job, {'status': 'failed', 'error': _extract_error(response, 'Sending job not found')})
+        st.rerun()
+
+    if response and response.status_code == 200:
+        job_status = response.json()
+        total = job_status.get('total', 0)
+        processed = job_status.get('sent', 0) + job_status.get('failed', 0)
+        st.progress(processed / total if total else 0.0, text=f"📤 Sent {processed} of {total} messages")
+
+        if job_status.get('status') in ('completed', 'failed'):
+            # A finished job carries the same summary fields as a synchronous send
+            finish_send_job(send_job, job_status)
+            st.rerun()
+
+        if processed != send_job['processed']:
+            send_job['processed'] = processed
+            send_job['last_progress_at'] = time.time()
+    else:
+        # Auth hiccups, rate limits and server errors say nothing about the job itself
+        st.warning(f"⚠️ {_extract_error(response, 'Unable to load sending progress')}. Retrying...")
+
+    # Stop polling a job that isn't moving (e.g. queued behind others), but don't call it failed:
+    # it may still be sending, and a "failed" label invites a duplicate send
+    if time.time() - send_job['last_progress_at'] > SEND_JOB_STALL_TIMEOUT:
+        send_job['stalled'] = True
+        st.rerun()
 
 def show_send_messages_page():
     """Send order confirmation messages with file-specific tracking"""
     st.title("📤 Send Order Messages")
     st.markdown("Send WhatsApp order confirmation messages with payment links.")
 
-    # Get validated files
-    response = make_api_request(API_ENDPOINTS['orders']['validated_files'])
+    # Overlap the orders read for the last selected file with the file-list load
+    previous_file_id = st.session_state.get("selected_file_id")
+    if previous_file_id is not None:
+        prefetch(_list_orders, previous_file_id)
 
-    if response and response.status_code == 200:
-        validated_files = response.json().get('results', [])
+    # Get validated files
+    validated_files = load_cached(_list_validated_files)
 
+    if validated_files is not None:
         if validated_files:
             st.subheader("📋 Select Validated File")
 
-            file_options = {
-                f"{f['file_name']} ({f.get('orders_extracted', 0)} orders)": f['id']
-                for f in validated_files
+            # Select by id so files sharing a name and order count stay distinct
+            file_labels = {
+                f['id']: f"{f['file_name']} ({f.get('orders_extracted', 0)} orders)" for f in validated_files
             }
-            selected_file = st.selectbox("Choose file to send messages:", list(file_options.keys()))
-
-            if selected_file:
-                file_id = file_options[selected_file]
+            file_id = st.selectbox(
+                "Choose file to send messages:",
+                options=list(file_labels),
+                format_func=lambda file_id: file_labels[file_id]
+            )
 
+            if file_id is not None:
                 # Store selected file in session state for persistence
                 st.session_state.selected_file_id = file_id
 
                 # Get file-specific orders and statistics
-                orders_response = make_api_request(f"orders/?validated_file={file_id}")
+                orders_data = load_cached(_list_orders, file_id)
 
-                if orders_response and orders_response.status_code == 200:
-                    orders_data = orders_response.json()
+                if orders_data is not None:
                     orders = orders_data.get('results', [])
                     file_stats = orders_data.get('file_stats', {})
 
@@ -678,18 +998,38 @@ def show_send_messages_page():
                         # Add refresh button
                         col_refresh, col_export = st.columns([1, 1])
                         with col_refresh:
-                            if st.button("🔄 Refresh Status", help="Get latest status updates"):
-                                st.rerun()
+                            st.button(
+                                "🔄 Refresh Status",
+                                help="Get latest status updates",
+                                on_click=_list_orders.clear,
+                                args=(st.session_state.access_token, file_id)
+                            )
                         with col_export:
                             # Export buttons
                             export_option = st.selectbox("📥 Export", ["Choose format...", "CSV", "Excel"])
                             if export_option != "Choose format...":
                                 if export_option == "CSV":
-                                    export_url = f"{API_BASE_URL}/api/orders/orders/export_csv/?validated_file={file_id}"
-                                    st.markdown(f"[📥 Download CSV]({export_url})")
+                                    export_action, file_name, mime = "export_csv", "orders.csv", "text/csv"
                                 else:
-                                    export_url = f"{API_BASE_URL}/api/orders/orders/export_excel/?validated_file={file_id}"
-                                    st.markdown(f"[📥 Download Excel]({export_url})")
+                                    export_action, file_name = "export_excel", "orders.xlsx"
+                                    mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+                                # Fetch only on request so unrelated reruns don't re-download the export
+                                if st.button(f"⚙️ Prepare {export_option} export"):
+                                    exported = download_file(
+                                        f"{API_ENDPOINTS['orders']['orders']}{export_action}/",
+                                        params={'validated_file': file_id}
+                                    )
+                                    if exported:
+                                        st.download_button(
+                                            label=f"📥 Download {export_option}",
+                                            data=exported,
+                                            file_name=file_name,
+                                            mime=mime,
+                                            on_click="ignore"
+                                        )
+                                    else:
+                                        st.error("❌ Export failed. Please try again.")
 
                 # Message sending section
                 col1, col2 = st.columns(2)
@@ -711,131 +1051,67 @@ def show_send_messages_page():
                         help="Time delay between sending messages"
                     )
 
-                if st.button("📤 Send Order Messages", type="primary", use_container_width=True):
-                    # Extract orders first if not done
-                    extract_response = make_api_request(
-                        f"{API_ENDPOINTS['orders']['validated_files']}{file_id}/extract_orders/",
-                        method="POST"
-                    )
-
-                    if extract_response and extract_response.status_code == 200:
-                        extract_data = extract_response.json()
-                        orders_extracted = extract_data.get('orders_extracted', 0)
-
-                        st.success(f"✅ Extracted {orders_extracted} orders successfully!")
-
-                        if orders_extracted > 0:
-                            # Show time estimation
-                            estimated_time = orders_extracted * 2  # 2 seconds per message
-                            st.info(f"⏱️ Estimated sending time: ~{estimated_time} seconds ({estimated_time//60}m {estimated_time%60}s)")
-
-                            # Send messages using new synchronous endpoint
-                            # progress_bar = st.progress(0)
-                            status_text = st.empty()
-
-                            status_text.text("📤 Sending WhatsApp messages (2-second delay between messages)...")
-
-                            # Call the new send messages endpoint
-                            send_response = make_api_request(
-                                f"{API_ENDPOINTS['orders']['send_messages']}",
-                                method="POST",
-                                data={'validated_file_id': file_id}
-                            )
-
-                            # progress_bar.progress(100.0)
-
-                            if send_response and send_response.status_code == 200:
-                                send_data = send_response.json()
-
-                                st.success("✅ Messages sent successfully!")
-
-                                # Show summary
-                                col1, col2, col3 = st.columns(3)
-                                with col1:
-                                    st.metric("📤 Total Orders", send_data.get('total_orders', 0))
-                                with col2:
-                                    st.metric("✅ Sent", send_data.get('sent_count', 0))
-                                with col3:
-                                    st.metric("❌ Failed", send_data.get('failed_count', 0))
-
-                                st.info(f"⏱️ Total time: {send_data.get('total_time_seconds', 0)} seconds")
-
-                                # Show detailed results
-                                if send_data.get('results'):
-                                    st.subheader("📋 Detailed Results")
-
-                                    results_df = pd.DataFrame(send_data['results'])
-
-                                    # Format the display
-                                    display_df = results_df[['order_id', 'number', 'status']].copy()
-                                    display_df.columns = ['Order ID', 'Phone Number', 'Status']
-
-                                    # Add status icons
-                                    display_df['Status'] = display_df['Status'].apply(
-                                        lambda x: f"✅ {x}" if x == 'sent' else f"❌ {x}"
-                                    )
-
-                                    st.dataframe(display_df, use_container_width=True)
-
-                            else:
-                                error_msg = "Failed to send messages"
-                                if send_response:
-                                    error_data = send_response.json()
-                                    error_msg = error_data.get('error', error_msg)
-                                st.error(f"❌ {error_msg}")
-                        else:
-                            st.warning("⚠️ No orders found to send messages for")
-
+                # A send still running for this file blocks another one, so customers aren't messaged twice
+                send_job = st.session_state.get("send_job")
+                sending = bool(send_job and send_job['file_id'] == file_id and 'result' not in send_job)
+
+                if st.button("📤 Send Order Messages", type="primary", use_container_width=True, disabled=sending):
+                    with st.spinner("📤 Extracting orders and queuing WhatsApp messages..."):
+                        send_response = make_api_request(
+                            f"{API_ENDPOINTS['orders']['send_messages']}",
+                            method="POST",
+                            data={'validated_file_id': file_id, 'auto_extract': True, 'async': True}
+                        )
+
+                    if send_response and send_response.status_code == 202:
+                        st.session_state.send_job = {
+                            'id': send_response.json()['job_id'],
+                            'file_id': file_id,
+                            'processed': 0,
+                            'last_progress_at': time.time()
+                        }
+                    elif send_response and send_response.status_code == 200:
+                        # Backend sent synchronously; the response already holds the results
+                        st.session_state.send_job = {'id': None, 'file_id': file_id}
+                        finish_send_job(st.session_state.send_job, send_response.json())
+                    else:
+                        st.error(f"❌ {_extract_error(send_response, 'Failed to send messages')}")
+
+                # Progress or results of the latest send for this file
+                send_job = st.session_state.get("send_job")
+                if send_job and send_job['file_id'] == file_id:
+                    if send_job.get('stalled'):
+                        st.info(
+                            "⏳ Sending status unknown: no progress reported for a while. The job may still be "
+                            "running or queued; check again before sending to these customers again."
+                        )
+                        col_check, col_stop = st.columns(2)
+                        with col_check:
+                            st.button("🔄 Check again", on_click=resume_send_job_polling, use_container_width=True)
+                        with col_stop:
+                            st.button("Stop tracking", on_click=stop_tracking_send_job, use_container_width=True)
+                    elif 'result' not in send_job:
+                        show_send_job_progress()
+                    elif send_job['result'].get('status') == 'failed':
+                        st.error(f"❌ {send_job['result'].get('error') or 'Failed to send messages'}")
                     else:
-                        error_msg = "Failed to extract orders from validated file"
-                        if extract_response:
-                            error_data = extract_response.json()
-                            error_msg = error_data.get('error', error_msg)
-                        st.error(f"❌ {error_msg}")
+                        show_send_results(send_job['result'])
         else:
             st.info("No validated files found. Please validate some orders first.")
     else:
         st.error("Unable to load validated files.")
 
-def show_payment_tracking_page():
-    """Track payment status for orders with file-specific filtering"""
-    st.title("💰 Payment Tracking")
-    st.markdown("Monitor payment status for sent order messages.")
-
-    # File selector for filtering
-    col1, col2 = st.columns([2, 1])
-
-    with col1:
-        # Get validated files for filter
-        validated_files_response = make_api_request(API_ENDPOINTS['orders']['validated_files'])
-        file_filter = "All Files"
-
-        if validated_files_response and validated_files_response.status_code == 200:
-            validated_files = validated_files_response.json().get('results', [])
-            file_options = ["All Files"] + [f['file_name'] for f in validated_files]
-            file_filter = st.selectbox("📁 Filter by file:", file_options)
-
-    with col2:
-        if st.button("🔄 Refresh Data", use_container_width=True):
-            st.rerun()
-
-    # Get orders with optional file filtering
-    endpoint = API_ENDPOINTS['orders']['orders']
-    if file_filter != "All Files":
-        # Find selected file ID
-        selected_file_id = None
-        for f in validated_files:
-            if f['file_name'] == file_filter:
-                selected_file_id = f['id']
-                break
+def show_payment_orders(selected_file_id: int = None, auto_refresh: bool = False):
+    """Payment metrics and orders table for the selected file (all files when None)"""
+    import pandas as pd
 
-        if selected_file_id:
-            endpoint += f"?validated_file={selected_file_id}"
+    if auto_refresh:
+        # Timed reruns should show fresh statuses, not the cached list
+        _list_orders.clear(st.session_state.access_token, selected_file_id)
 
-    response = make_api_request(endpoint)
+    orders_data = load_cached(_list_orders, selected_file_id)
 
-    if response and response.status_code == 200:
-        orders_data = response.json()
+    if orders_data is not None:
         orders = orders_data.get('results', [])
         file_stats = orders_data.get('file_stats', {})
 
@@ -843,10 +1119,14 @@ def show_payment_tracking_page():
             # Summary metrics
             col1, col2, col3, col4 = st.columns(4)
 
+            # Count message and payment statuses in a single pass
+            status_counts = Counter(o['status'] for o in orders)
+            payment_counts = Counter(o['payment_status'] for o in orders)
+
             total_orders = len(orders)
-            sent_orders = len([o for o in orders if o['status'] in ['sent', 'delivered', 'read']])
-            pending_payments = len([o for o in orders if o['payment_status'] == 'pending'])
-            completed_payments = len([o for o in orders if o['payment_status'] == 'completed'])
+            sent_orders = status_counts['sent'] + status_counts['delivered'] + status_counts['read']
+            pending_payments = payment_counts['pending']
+            completed_payments = payment_counts['completed']
 
             with col1:
                 st.metric("Total Orders", total_orders)
@@ -862,58 +1142,106 @@ def show_payment_tracking_page():
             # Orders table
             st.subheader("📋 Orders & Payment Status")
 
-            df = pd.DataFrame(orders)
-
             # Format for display
-            display_df = df[['number', 'amount', 'status', 'payment_status', 'created_at']].copy()
+            display_df = pd.DataFrame.from_records(
+                orders, columns=['number', 'amount', 'status', 'payment_status', 'created_at']
+            )
             display_df.columns = ['Phone Number', 'Amount ($)', 'Message Status', 'Payment Status', 'Created']
-            display_df['Created'] = pd.to_datetime(display_df['Created']).dt.strftime('%Y-%m-%d %H:%M')
+            display_df['Created'] = pd.to_datetime(
+                display_df['Created'], format='ISO8601', cache=True
+            ).dt.strftime('%Y-%m-%d %H:%M')
 
             # Color code statuses
-            def color_status(val):
-                colors = {
-                    'pending': 'background-color: #fff3cd',
-                    'sent': 'background-color: #d1ecf1',
-                    'delivered': 'background-color: #d4edda',
-                    'failed': 'background-color: #f8d7da',
-                    'completed': 'background-color: #d4edda'
-                }
-                return colors.get(val, '')
-
-            styled_df = display_df.style.applymap(color_status, subset=['Message Status', 'Payment Status'])
+            styled_df = display_df.style.map(
+                lambda val: STATUS_CELL_STYLES.get(val, ''), subset=['Message Status', 'Payment Status']
+            )
             st.dataframe(styled_df, use_container_width=True, hide_index=True)
 
             # Refresh controls
             col1, col2 = st.columns(2)
             with col1:
-                if st.button("🔄 Refresh Status", use_container_width=True):
-                    st.rerun()
-
-            with col2:
-                auto_refresh = st.checkbox("Auto-refresh (30s)")
-                if auto_refresh:
-                    time.sleep(30)
-                    st.rerun()
+                # Invalidate before the click's rerun; inside the fragment only this section reruns
+                st.button(
+                    "🔄 Refresh Status",
+                    use_container_width=True,
+                    on_click=_list_orders.clear,
+                    args=(st.session_state.access_token, selected_file_id)
+                )
         else:
             st.info("No orders found. Process some files and send messages first.")
     else:
         st.error("Unable to load orders.")
 
+def refresh_payment_data():
+    """Button callback: drop this user's cached file list and orders before the page reruns"""
+    token = st.session_state.access_token
+    _list_validated_files.clear(token)
+    _list_orders.clear(token, st.session_state.get("payment_file_filter"))
+
+def show_payment_tracking_page():
+    """Track payment status for orders with file-specific filtering"""
+    st.title("💰 Payment Tracking")
+    st.markdown("Monitor payment status for sent order messages.")
+
+    # File selector for filtering
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        # Overlap the orders read for the current filter with the file-list load
+        if not st.session_state.get("payment_auto_refresh"):
+            prefetch(_list_orders, st.session_state.get("payment_file_filter"))
+
+        # Get validated files for filter
+        validated_files = load_cached(_list_validated_files)
+        selected_file_id = None
+
+        if validated_files is not None:
+            # Select by id so no name-to-id scan is needed afterwards
+            file_names = {f['id']: f['file_name'] for f in validated_files}
+            selected_file_id = st.selectbox(
+                "📁 Filter by file:",
+                options=[None] + list(file_names),
+                format_func=lambda file_id: "All Files" if file_id is None else file_names[file_id],
+                key="payment_file_filter"
+            )
+
+    with col2:
+        st.button("🔄 Refresh Data", use_container_width=True, on_click=refresh_payment_data)
+        auto_refresh = st.checkbox("Auto-refresh (30s)", key="payment_auto_refresh")
+
+    # Auto-refresh reruns only the orders section on a browser-side timer, so no server thread sleeps
+    orders_section = st.fragment(show_payment_orders, run_every=30 if auto_refresh else None)
+    orders_section(selected_file_id, auto_refresh)
+
+def refresh_analytics():
+    """Button callback: drop this user's cached aggregates and every activity page visited"""
+    token = st.session_state.access_token
+    _get_analytics.clear(token)
+    for activity_page in st.session_state.pop("activity_pages_seen", set()):
+        _get_recent_activity.clear(token, activity_page)
+
 def show_analytics_page():
     """Comprehensive analytics dashboard"""
     st.title("📈 Analytics Dashboard")
     st.markdown("Comprehensive insights into your WhatsApp order campaigns.")
 
-    # Get analytics data
-    response = make_api_request(API_ENDPOINTS['orders']['analytics'])
+    # Get analytics data; aggregates are cached once per user, later activity pages separately
+    analytics = load_cached(_get_analytics)
 
-    if response and response.status_code == 200:
-        analytics = response.json()
+    if analytics is not None:
         overview = analytics.get('overview', {})
         message_stats = analytics.get('message_stats', {})
         payment_stats = analytics.get('payment_stats', {})
         file_breakdown = analytics.get('file_breakdown', [])
-        recent_activity = analytics.get('recent_activity', [])
+
+        # The recent-activity page is picked further down
+        activity_page = st.session_state.get("activity_page", 1)
+        if activity_page == 1:
+            recent_activity = analytics.get('recent_activity', [])
+        else:
+            # Remember visited pages so a refresh can clear each of them
+            st.session_state.setdefault("activity_pages_seen", set()).add(activity_page)
+            recent_activity = load_cached(_get_recent_activity, activity_page) or []
 
         # Overview section
         st.subheader("🎯 Performance Overview")
@@ -955,26 +1283,23 @@ def show_analytics_page():
         if file_breakdown:
             st.subheader("📁 File Performance Breakdown")
 
-            # Create dataframe for file breakdown
-            df_files = pd.DataFrame(file_breakdown)
-
-            # Format for display
-            display_df = df_files[[
-                'file_name', 'total_orders', 'sent', 'delivered', 'read',
-                'payment_completed', 'success_rate', 'payment_conversion', 'revenue'
-            ]].copy()
-
-            display_df.columns = [
-                'File Name', 'Orders', 'Sent', 'Delivered', 'Read',
-                'Paid', 'Success %', 'Payment %', 'Revenue (₹)'
+            # Format for display; st.dataframe takes the rows directly, so no DataFrame is built
+            file_rows = [
+                {
+                    'File Name': f['file_name'],
+                    'Orders': f['total_orders'],
+                    'Sent': f['sent'],
+                    'Delivered': f['delivered'],
+                    'Read': f['read'],
+                    'Paid': f['payment_completed'],
+                    'Success %': round(f['success_rate'], 1),
+                    'Payment %': round(f['payment_conversion'], 1),
+                    'Revenue (₹)': round(f['revenue'])
+                }
+                for f in file_breakdown
             ]
 
-            # Format percentages and revenue
-            display_df['Success %'] = display_df['Success %'].round(1)
-            display_df['Payment %'] = display_df['Payment %'].round(1)
-            display_df['Revenue (₹)'] = display_df['Revenue (₹)'].round(0)
-
-            st.dataframe(display_df, use_container_width=True, hide_index=True)
+            st.dataframe(file_rows, use_container_width=True, hide_index=True)
 
         st.markdown("---")
 
@@ -998,20 +1323,30 @@ def show_analytics_page():
                 st.metric("🚀 Initiated", payment_stats.get('initiated', 0))
                 st.metric("❌ Failed", payment_stats.get('failed', 0))
 
-        # Recent activity
-        if recent_activity:
+        # Recent activity, fetched one page at a time
+        if recent_activity or activity_page > 1:
             st.markdown("---")
             st.subheader("🕐 Recent Activity")
-
-            activity_df = pd.DataFrame(recent_activity)
-            display_activity = activity_df[['order_id', 'phone', 'status', 'payment_status', 'file_name']].copy()
-            display_activity.columns = ['Order ID', 'Phone', 'Message', 'Payment', 'File']
-
-            st.dataframe(display_activity, use_container_width=True, hide_index=True)
+            st.number_input("Page", min_value=1, step=1, key="activity_page")
+
+            if recent_activity:
+                activity_rows = [
+                    {
+                        'Order ID': a['order_id'],
+                        'Phone': a['phone'],
+                        'Message': a['status'],
+                        'Payment': a['payment_status'],
+                        'File': a['file_name']
+                    }
+                    for a in recent_activity
+                ]
+
+                st.dataframe(activity_rows, use_container_width=True, hide_index=True)
+            else:
+                st.info("No more activity.")
 
         # Refresh button
-        if st.button("🔄 Refresh Analytics", use_container_width=True):
-            st.rerun()
+        st.button("🔄 Refresh Analytics", use_container_width=True, on_click=refresh_analytics)
 
     else:
         st.error("Unable to load analytics data. Please ensure the backend is running.")
@@ -1024,23 +1359,9 @@ def main():
     """Main application logic"""
     init_session_state()
 
-    # Custom CSS for better UI
-    st.markdown("""
-    <style>
-    .stMetric > div > div > div > div {
-        font-size: 1.1rem;
-    }
-    .uploadedFile {
-        border: 2px dashed #1f77b4;
-        border-radius: 10px;
-        padding: 10px;
-    }
-    .stProgress .progress-text {
-        font-size: 1rem;
-        font-weight: bold;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Custom CSS for better UI; re-emitted each run because Streamlit drops elements a rerun
+    # doesn't produce, and the frontend reuses the unchanged node in place
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
     if st.session_state.is_authenticated:
         show_dashboard_page()
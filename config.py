@@ -43,6 +43,15 @@ STATUS_COLORS = {
     'failed': '#d62728'
 }
 
+# Table cell styles for order/payment statuses
+STATUS_CELL_STYLES = {
+    'pending': 'background-color: #fff3cd',
+    'sent': 'background-color: #d1ecf1',
+    'delivered': 'background-color: #d4edda',
+    'failed': 'background-color: #f8d7da',
+    'completed': 'background-color: #d4edda'
+}
+
 # Message Type Colors
 MESSAGE_TYPE_COLORS = {
     'order': '#28a745',
@@ -61,6 +70,7 @@ ALLOWED_VALIDATION_TYPES = ['xlsx', 'csv']
 # Processing Settings
 PROCESSING_TIMEOUT = 300  # 5 minutes
 STREAMING_TIMEOUT = 600   # 10 minutes for large files
+SEND_JOB_STALL_TIMEOUT = 300  # Stop polling a send job after 5 minutes without progress
 
 # API Endpoints
 API_ENDPOINTS = {
@@ -79,6 +89,7 @@ API_ENDPOINTS = {
         'analytics': '/orders/analytics/',
         'process_stream': '/orders/process-stream/',
         'send_messages': '/orders/send-messages/',
+        'send_jobs': '/orders/send-messages/jobs/',
     }
 }
 